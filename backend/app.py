@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
+import os
 import threading
-import time
-from secure_delete import SecureDelete
+from collections import deque
+from itertools import chain
+from secure_delete import SecureDelete, IO_MODES, FILL_MAX_WRITERS
+from file_walker import parse_files, parse_specs, expand_specs
+import metrics
 from pathlib import Path
 
 app = Flask(__name__)
@@ -11,43 +15,75 @@ CORS(app)
 
 wipe_sessions = {}
 
+RECENT_FILES_LIMIT = 20  # files kept per session for status reporting
+
+metrics.Gauge('wipe_sessions_active', 'Wipe sessions still running',
+              lambda: sum(1 for s in list(wipe_sessions.values()) if not s.complete))
+
 class WipeSession:
-    def __init__(self, session_id, files, wipe_all):
+    def __init__(self, session_id, specs, wipe_all, io_mode='buffered',
+                 mount_point=None, throttle_mbps=None, writers=4):
         self.session_id = session_id
-        self.files = files
+        self.specs = specs
         self.wipe_all = wipe_all
+        self.io_mode = io_mode
+        self.mount_point = mount_point
+        self.throttle_mbps = throttle_mbps
+        self.writers = writers
+        self.bytes_written = 0
+        self.bytes_total = 0
         self.pass_num = 0
         self.complete = False
         self.success = False
         self.current_file = ""
+        self.files_wiped = 0
+        self.files_skipped = 0
+        self.bytes_wiped = 0
+        self.recent_files = deque(maxlen=RECENT_FILES_LIMIT)
         
 def run_wipe_operation(session_id, files, wipe_all):
     session = wipe_sessions[session_id]
-    deleter = SecureDelete(verbose=True)
+    
+    def on_pass(pass_num):
+        session.pass_num = pass_num
+    
+    deleter = SecureDelete(verbose=True, io_mode=session.io_mode, on_pass=on_pass)
     
     try:
         if wipe_all:
-            for pass_num in range(1, 4):
-                session.pass_num = pass_num
-                time.sleep(2)  
-            session.success = True
+            def on_progress(written, total):
+                session.bytes_written = written
+                session.bytes_total = total
+            
+            session.pass_num = 1
+            session.current_file = session.mount_point
+            session.success = deleter.wipe_free_space(
+                session.mount_point,
+                writers=session.writers,
+                throttle_mbps=session.throttle_mbps,
+                progress=on_progress
+            )
         else:
-            total_files = len(files)
-            for idx, file in enumerate(files):
+            # files is a lazy iterator; only counters and a bounded window are kept
+            for file in files:
                 session.current_file = file
                 
-                if Path(file).exists():
-                    for pass_num in range(1, 4):
-                        session.pass_num = pass_num
-                        time.sleep(1)  
-                    
-                    success = deleter.secure_delete_file(file)
-                    if not success:
-                        session.success = False
-                        session.complete = True
-                        return
-                else:
-                    print(f"File not found: {file}")
+                try:
+                    file_size = Path(file).stat().st_size
+                except OSError:
+                    metrics.log(f"File not found: {file}")
+                    session.files_skipped += 1
+                    continue
+                
+                success = deleter.secure_delete_file(file)
+                if not success:
+                    session.success = False
+                    session.complete = True
+                    return
+                
+                session.files_wiped += 1
+                session.bytes_wiped += file_size
+                session.recent_files.append(file)
             
             session.success = True
         
@@ -55,7 +91,7 @@ def run_wipe_operation(session_id, files, wipe_all):
         session.complete = True
         
     except Exception as e:
-        print(f"Error during wipe: {e}")
+        metrics.log(f"Error during wipe: {e}")
         session.success = False
         session.complete = True
 
@@ -64,18 +100,52 @@ def start_wipe():
     data = request.json
     
     session_id = data.get('sessionId')
-    files = data.get('files', [])
+    files = data.get('files') or []
+    raw_specs = data.get('specs') or []
     wipe_all = data.get('wipeAll', False)
+    io_mode = data.get('ioMode', 'buffered')
+    mount_point = data.get('mountPoint')
+    throttle_mbps = data.get('throttleMBps')
+    writers = data.get('writers', 4)
     
     if not session_id:
         return jsonify({'error': 'No session ID provided'}), 400
     
-    session = WipeSession(session_id, files, wipe_all)
+    if io_mode not in IO_MODES:
+        return jsonify({'error': f'Invalid ioMode, expected one of {list(IO_MODES)}'}), 400
+    
+    if wipe_all and (not isinstance(mount_point, str) or not os.path.isdir(mount_point)):
+        return jsonify({'error': 'mountPoint must be an existing directory when wipeAll is set'}), 400
+    
+    if throttle_mbps is not None and (isinstance(throttle_mbps, bool)
+                                      or not isinstance(throttle_mbps, (int, float))
+                                      or throttle_mbps <= 0):
+        return jsonify({'error': 'throttleMBps must be a positive number'}), 400
+    
+    if isinstance(writers, bool) or not isinstance(writers, int) or not 1 <= writers <= FILL_MAX_WRITERS:
+        return jsonify({'error': f'writers must be an integer between 1 and {FILL_MAX_WRITERS}'}), 400
+    
+    try:
+        specs = parse_specs(raw_specs)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid specs: {e}'}), 400
+    
+    try:
+        files = parse_files(files)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid files: {e}'}), 400
+    
+    # Explicit file paths are wiped first, then specs are expanded lazily and
+    # directories they walked are removed once emptied
+    paths = chain(files, expand_specs(specs, prune_dirs=True))
+    
+    session = WipeSession(session_id, specs, wipe_all, io_mode,
+                          mount_point, throttle_mbps, writers)
     wipe_sessions[session_id] = session
     
     thread = threading.Thread(
         target=run_wipe_operation,
-        args=(session_id, files, wipe_all)
+        args=(session_id, paths, wipe_all)
     )
     thread.daemon = True
     thread.start()
@@ -98,11 +168,19 @@ def get_wipe_status(session_id):
         'pass': session.pass_num,
         'complete': session.complete,
         'success': session.success,
-        'currentFile': session.current_file
+        'currentFile': session.current_file,
+        'bytesWritten': session.bytes_written,
+        'bytesTotal': session.bytes_total,
+        'filesWiped': session.files_wiped,
+        'filesSkipped': session.files_skipped,
+        'bytesWiped': session.bytes_wiped,
+        'recentFiles': list(session.recent_files)
     })
 
 @app.route('/api/browse', methods=['POST'])
 def browse_files():
+    mode = (request.get_json(silent=True) or {}).get('mode', 'files')
+    
     try:
         import tkinter as tk
         from tkinter import filedialog
@@ -111,6 +189,23 @@ def browse_files():
         root.withdraw()  
         root.attributes('-topmost', True)  
         
+        if mode == 'folder':
+            # Return a directory spec; the tree is expanded server-side by /api/wipe
+            folder = filedialog.askdirectory(title='Select folder to securely delete')
+            root.destroy()
+            
+            if folder:
+                return jsonify({
+                    'files': [],
+                    'specs': [{'path': folder}],
+                    'message': f'Folder selected: {folder}'
+                })
+            return jsonify({
+                'files': [],
+                'specs': [],
+                'message': 'No folder selected'
+            })
+        
         file_paths = filedialog.askopenfilenames(
             title='Select files to securely delete',
             filetypes=[
@@ -136,12 +231,17 @@ def browse_files():
             })
             
     except Exception as e:
-        print(f"Error opening file dialog: {e}")
+        metrics.log(f"Error opening file dialog: {e}")
         return jsonify({
             'error': str(e),
             'message': 'Failed to open file dialog'
         }), 500
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text exposition of backend timings and queue depths"""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -0,0 +1,219 @@
+"""
+Lazy expansion of wipe path specs into file paths.
+
+A spec is either a string (a file, a directory or a glob pattern) or a dict:
+    {
+        "path": "/home/user/old",     # file, directory or glob pattern
+        "include": ["*.pdf"],         # file name patterns to keep (default: all)
+        "exclude": ["*.tmp", ".git"], # file/directory name patterns to skip
+        "recursive": true,            # descend into subdirectories (default: true)
+        "minSize": 0, "maxSize": ..., # bytes
+        "minAge": 0, "maxAge": ...    # seconds since last modification
+    }
+
+Hidden (dot) files and directories are always included, both by directory
+walks and by glob patterns; use "exclude": [".*"] to skip them. Globs only
+match dotfiles on Python 3.11+ (glob's include_hidden).
+
+Files are yielded one at a time straight from the directory iterator, so
+memory does not grow with the size of the tree or of any single directory;
+only the stack of pending subdirectory paths is held.
+
+With prune_dirs set, directories are removed (deepest first) once the caller
+has consumed them, if they end up empty and the walk yielded files from them
+or removed one of their subdirectories. Directories the walk never took
+anything from, such as ones that were already empty or held only files the
+filters skipped, are left alone. A spec with no filters at all selects the
+whole directory, so like secure_delete_folder it also removes empty
+directories that were there before, including its root.
+"""
+
+import os
+import sys
+import glob
+import time
+import stat
+from fnmatch import fnmatch
+from typing import Iterable, Iterator, List, Union
+
+SPEC_KEYS = {'path', 'include', 'exclude', 'recursive',
+             'minSize', 'maxSize', 'minAge', 'maxAge'}
+NUMERIC_KEYS = ('minSize', 'maxSize', 'minAge', 'maxAge')
+
+
+def parse_spec(raw: Union[str, dict]) -> dict:
+    """Validate a raw spec from the API and fill in defaults (raises ValueError)"""
+    if isinstance(raw, str):
+        raw = {'path': raw}
+
+    if not isinstance(raw, dict):
+        raise ValueError("Spec must be a path string or an object")
+
+    unknown = set(raw) - SPEC_KEYS
+    if unknown:
+        raise ValueError(f"Unknown spec field(s): {', '.join(sorted(unknown))}")
+
+    path = raw.get('path')
+    if not isinstance(path, str) or not path:
+        raise ValueError("Spec 'path' must be a non-empty string")
+    if not os.path.isabs(path):
+        raise ValueError(f"Spec path must be absolute: {path}")
+
+    spec = {
+        'path': path,
+        'include': raw.get('include') or [],
+        'exclude': raw.get('exclude') or [],
+        'recursive': raw.get('recursive', True),
+    }
+
+    for key in ('include', 'exclude'):
+        patterns = spec[key]
+        if not isinstance(patterns, list) or not all(isinstance(p, str) for p in patterns):
+            raise ValueError(f"Spec '{key}' must be a list of patterns")
+
+    if not isinstance(spec['recursive'], bool):
+        raise ValueError("Spec 'recursive' must be true or false")
+
+    for key in NUMERIC_KEYS:
+        value = raw.get(key)
+        if value is not None and (isinstance(value, bool)
+                                  or not isinstance(value, (int, float))
+                                  or value < 0):
+            raise ValueError(f"Spec '{key}' must be a non-negative number")
+        spec[key] = value
+
+    return spec
+
+
+def _excluded(name: str, spec: dict) -> bool:
+    return any(fnmatch(name, pattern) for pattern in spec['exclude'])
+
+
+def _matches(name: str, st: os.stat_result, spec: dict, now: float) -> bool:
+    """Apply include patterns and size/age filters to a regular file"""
+    if spec['include'] and not any(fnmatch(name, p) for p in spec['include']):
+        return False
+
+    size = st.st_size
+    if spec['minSize'] is not None and size < spec['minSize']:
+        return False
+    if spec['maxSize'] is not None and size > spec['maxSize']:
+        return False
+
+    age = now - st.st_mtime
+    if spec['minAge'] is not None and age < spec['minAge']:
+        return False
+    if spec['maxAge'] is not None and age > spec['maxAge']:
+        return False
+
+    return True
+
+
+def _unfiltered(spec: dict) -> bool:
+    """True if the spec selects everything under its path"""
+    return (not spec['include'] and not spec['exclude']
+            and all(spec[key] is None for key in NUMERIC_KEYS))
+
+
+def _walk_dir(root: str, spec: dict, now: float, prune_dirs: bool = False) -> Iterator[str]:
+    """Depth-first walk that never follows symlinks"""
+    prune_all = prune_dirs and _unfiltered(spec)
+    # Directories in progress that yielded a file or lost a subdirectory
+    touched = set()
+    stack = [(root, False)]
+
+    while stack:
+        current, children_done = stack.pop()
+
+        if children_done:
+            # All files and subdirectories of current have been consumed
+            if prune_all or current in touched:
+                try:
+                    os.rmdir(current)
+                    if current != root:
+                        touched.add(os.path.dirname(current))
+                except OSError:
+                    pass  # still holds files the spec did not select
+            touched.discard(current)
+            continue
+
+        try:
+            it = os.scandir(current)
+        except OSError:
+            continue
+
+        if prune_dirs:
+            # Pushed below the subdirectories, so it is revisited after them
+            stack.append((current, True))
+
+        # Callers rename and unlink files while the listing is open. readdir
+        # still returns every untouched entry once; entries for files already
+        # wiped may show up stale and are dropped when their stat fails.
+        with it:
+            for entry in it:
+                if _excluded(entry.name, spec):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if spec['recursive']:
+                            stack.append((entry.path, False))
+                    elif entry.is_file(follow_symlinks=False):
+                        if _matches(entry.name, entry.stat(follow_symlinks=False), spec, now):
+                            if prune_dirs:
+                                touched.add(current)
+                            yield entry.path
+                except OSError:
+                    continue
+
+
+def expand_spec(spec: dict, prune_dirs: bool = False) -> Iterator[str]:
+    """
+    Yield the files selected by a single parsed spec. With prune_dirs, walked
+    directories the caller has emptied are removed (see module docstring).
+    """
+    now = time.time()
+    path = spec['path']
+
+    if any(c in path for c in '*?['):
+        if sys.version_info >= (3, 11):
+            matches = glob.iglob(path, recursive=spec['recursive'], include_hidden=True)
+        else:
+            matches = glob.iglob(path, recursive=spec['recursive'])
+    else:
+        matches = iter([path])
+
+    for match in matches:
+        try:
+            st = os.lstat(match)
+        except OSError:
+            continue
+
+        if stat.S_ISDIR(st.st_mode):
+            yield from _walk_dir(match, spec, now, prune_dirs)
+        elif stat.S_ISREG(st.st_mode):
+            name = os.path.basename(match)
+            if not _excluded(name, spec) and _matches(name, st, spec, now):
+                yield match
+
+
+def expand_specs(specs: Iterable[dict], prune_dirs: bool = False) -> Iterator[str]:
+    """Yield the files selected by each parsed spec in turn"""
+    for spec in specs:
+        yield from expand_spec(spec, prune_dirs)
+
+
+def parse_specs(raw_specs: List[Union[str, dict]]) -> List[dict]:
+    """Validate a list of raw specs from the API (raises ValueError)"""
+    if not isinstance(raw_specs, list):
+        raise ValueError("'specs' must be a list")
+    return [parse_spec(raw) for raw in raw_specs]
+
+
+def parse_files(files: List[str]) -> List[str]:
+    """Validate an explicit list of file paths from the API (raises ValueError)"""
+    if not isinstance(files, list):
+        raise ValueError("'files' must be a list")
+    for path in files:
+        if not isinstance(path, str) or not os.path.isabs(path):
+            raise ValueError(f"File paths must be absolute path strings: {path!r}")
+    return files
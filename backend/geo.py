@@ -1,5 +1,6 @@
-from flask import Flask, jsonify, render_template, request, abort
-import csv, math, os
+from flask import Flask, Response, jsonify, render_template, request, abort
+import csv, math, os, time
+import metrics
 
 app = Flask(__name__)
 CSV_PATH = os.path.join(os.path.dirname(__file__), "centers_recycling.csv")
@@ -23,7 +24,14 @@ def load_centers():
                 continue
     return centers
 
-CENTERS = load_centers()
+LOAD_SECONDS = metrics.Histogram('nearby_load_seconds', 'Time to load the recycling centers CSV')
+INDEX_SECONDS = metrics.Histogram('nearby_index_seconds', '/api/nearby bounding-box candidate scan time')
+QUERY_SECONDS = metrics.Histogram('nearby_query_seconds', '/api/nearby total query time')
+
+with LOAD_SECONDS.time():
+    CENTERS = load_centers()
+
+metrics.Gauge('nearby_centers', 'Recycling centers loaded', lambda: len(CENTERS))
 
 def haversine_distance(lat1, lon1, lat2, lon2):
     R = 6371.0
@@ -44,6 +52,7 @@ def index():
 
 @app.route('/api/nearby')
 def api_nearby():
+    start = time.perf_counter()
     try:
         lat = float(request.args.get('lat'))
         lng = float(request.args.get('lng'))
@@ -54,7 +63,9 @@ def api_nearby():
     limit = int(request.args.get('limit', 30))
 
     minlat, maxlat, minlng, maxlng = bbox_from_radius(lat, lng, radius_km)
+    index_start = time.perf_counter()
     candidates = [c for c in CENTERS if c['lat'] is not None and minlat <= c['lat'] <= maxlat and minlng <= c['lng'] <= maxlng]
+    INDEX_SECONDS.observe(time.perf_counter() - index_start)
 
     features = []
     for c in candidates:
@@ -67,7 +78,12 @@ def api_nearby():
             })
 
     features.sort(key=lambda f: f["properties"]["distance_km"])
+    QUERY_SECONDS.observe(time.perf_counter() - start)
     return jsonify({"type": "FeatureCollection", "features": features[:limit]})
 
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 if __name__ == "__main__":
     app.run(debug=True)
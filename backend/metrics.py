@@ -0,0 +1,223 @@
+"""
+Lightweight instrumentation: histograms, gauges and an async logger.
+
+Metrics are registered in a process-wide registry and rendered in the
+Prometheus text exposition format by render(), which each Flask app serves
+at /metrics. Observations are a bisect plus a few integer updates under a
+lock, and are only taken per pass/file/request, never per chunk.
+"""
+
+import sys
+import time
+import queue
+import atexit
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LOG_QUEUE_SIZE = 10000  # messages buffered before the async logger drops them
+
+# Seconds; covers sub-millisecond lookups up to multi-minute passes
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+_registry: Dict[str, object] = {}
+_registry_lock = threading.Lock()
+
+
+def _register(metric):
+    with _registry_lock:
+        if metric.name in _registry:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        _registry[metric.name] = metric
+    return metric
+
+
+def _format_value(value: float) -> str:
+    if value != value:
+        return 'NaN'
+    if value == float('inf'):
+        return '+Inf'
+    if value == float('-inf'):
+        return '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative histogram of observed values (usually durations in seconds)"""
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.lock = threading.Lock()
+        _register(self)
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self) -> '_Timer':
+        """Context manager that observes the elapsed time of its block"""
+        return _Timer(self)
+
+    def render(self) -> List[str]:
+        with self.lock:
+            counts = list(self.counts)
+            total = self.sum
+
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{_format_value(bound)}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {_format_value(total)}")
+        lines.append(f"{self.name}_count {cumulative}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Gauge:
+    """Value read from a callback at scrape time (e.g. a queue depth)"""
+
+    type = 'gauge'
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.read = read
+        _register(self)
+
+    def render(self) -> List[str]:
+        try:
+            value = self.read()
+        except Exception:
+            value = float('nan')
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}",
+                f"{self.name} {_format_value(value)}"]
+
+
+class Counter(Gauge):
+    """Monotonically increasing total read from a callback at scrape time"""
+
+    type = 'counter'
+
+
+class AsyncLogger:
+    """
+    Non-blocking replacement for print(): messages go on a bounded queue and
+    a daemon thread writes them out, so hot loops never wait on the terminal.
+    When the queue is full (stdout slower than the producers) messages are
+    dropped and counted rather than buffered without limit. Write errors
+    (e.g. UnicodeEncodeError on a non-UTF-8 console, BrokenPipeError) are
+    counted and the writer keeps going.
+    """
+
+    def __init__(self, stream=None, maxsize: int = LOG_QUEUE_SIZE):
+        self.stream = stream
+        self.queue = queue.Queue(maxsize)
+        self.thread = None
+        self.lock = threading.Lock()
+        self.dropped = 0
+        self.write_errors = 0
+        atexit.register(self.flush)
+
+    def _start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+
+    def _write(self, stream, text: str):
+        try:
+            stream.write(text)
+        except Exception:
+            self.write_errors += 1
+
+    def _flush_stream(self, stream):
+        try:
+            stream.flush()
+        except Exception:
+            self.write_errors += 1
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            stream = self.stream or sys.stdout
+            # Batch whatever else is already queued before flushing
+            while True:
+                if isinstance(item, threading.Event):
+                    self._flush_stream(stream)
+                    item.set()
+                else:
+                    self._write(stream, item + '\n')
+                if self.queue.empty():
+                    break
+                item = self.queue.get()
+            self._flush_stream(stream)
+
+    def log(self, message: str):
+        if self.thread is None:
+            self._start()
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    def flush(self, timeout: float = 2.0):
+        """Wait (bounded) until everything logged so far is written, e.g. at exit"""
+        if self.thread is None:
+            return
+        done = threading.Event()
+        try:
+            self.queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+
+logger = AsyncLogger()
+
+
+def log(message: str):
+    logger.log(message)
+
+
+COLLECT_SECONDS = Histogram('metrics_collect_seconds', 'Time to collect and render /metrics')
+Gauge('log_queue_depth', 'Messages waiting in the async log queue', logger.depth)
+Counter('log_messages_dropped_total', 'Log messages dropped because the queue was full',
+        lambda: logger.dropped)
+Counter('log_write_errors_total', 'Failed writes to the log stream', lambda: logger.write_errors)
+
+
+def render() -> str:
+    """Render every registered metric in the Prometheus text format"""
+    with COLLECT_SECONDS.time():
+        with _registry_lock:
+            metrics = list(_registry.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
@@ -7,21 +7,83 @@ SSD: ATA Secure Erase for specific files/folders
 
 import os
 import sys
+import mmap
+import errno
+import time
 import random
+import shutil
+import threading
 import subprocess
 import platform
 from pathlib import Path
-from typing import Tuple
+from typing import Callable, List, Optional, Tuple
+
+import metrics
+
+# I/O modes for the overwrite passes:
+#   buffered - plain writes through the page cache
+#   direct   - aligned O_DIRECT writes from an mmap'd buffer (falls back to nocache)
+#   nocache  - buffered writes, completed ranges dropped with posix_fadvise(DONTNEED)
+IO_MODES = ('buffered', 'direct', 'nocache')
+
+CHUNK_SIZE = 65536              # 64KB chunks for buffered writes
+DIRECT_ALIGN = 4096             # O_DIRECT offset/length/buffer alignment
+DIRECT_CHUNK_SIZE = 1 << 20     # 1MB chunks for O_DIRECT writes
+NOCACHE_FLUSH_BYTES = 8 << 20   # sync + drop cache every 8MB in nocache mode
+
+FILL_FILE_SIZE = 1 << 30        # free-space wipe: 1GB preallocated fill files
+FILL_CHUNK_SIZE = 1 << 20       # free-space wipe: 1MB streaming writes
+FILL_SAFETY_MARGIN = 256 << 20  # free-space wipe: leave 256MB free by default
+FILL_MAX_WRITERS = 16           # free-space wipe: upper bound on parallel writers
+
+PASS_WRITE_SECONDS = metrics.Histogram('wipe_pass_write_seconds',
+                                       'Time to write one overwrite pass (excluding final fsync)')
+FSYNC_SECONDS = metrics.Histogram('wipe_fsync_seconds',
+                                  'Time of the fsync that ends each overwrite pass')
+FILE_WIPE_SECONDS = metrics.Histogram('wipe_file_seconds',
+                                      'End-to-end secure deletion latency per file')
+
+
+class _Throttle:
+    """Token bucket shared by all free-space writers (bytes per second)"""
+    
+    def __init__(self, rate: Optional[float]):
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.next_time = time.monotonic()
+    
+    def wait(self, nbytes: int):
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + nbytes / self.rate
+        delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+
 
 class SecureDelete:
     """Smart secure deletion based on drive type"""
     
-    def __init__(self, verbose: bool = True):
+    def __init__(self, verbose: bool = True, io_mode: str = 'buffered',
+                 on_pass: Optional[Callable[[int], None]] = None):
+        if io_mode not in IO_MODES:
+            raise ValueError(f"Invalid io_mode '{io_mode}', expected one of {IO_MODES}")
         self.verbose = verbose
+        self.io_mode = io_mode
+        self.on_pass = on_pass
         
     def _log(self, message: str):
         if self.verbose:
-            print(message)
+            metrics.log(message)
+    
+    def _start_pass(self, pass_num: int):
+        """Log the start of an overwrite pass and notify on_pass"""
+        self._log(f"    Pass {pass_num}/3...")
+        if self.on_pass:
+            self.on_pass(pass_num)
     
     def _is_ssd(self, filepath: str) -> Tuple[bool, str]:
         """
@@ -102,16 +164,25 @@ class SecureDelete:
             
             patterns = [b'\x00', b'\xFF', None]  # None = random
             
+            if self.io_mode == 'direct':
+                if self._direct_overwrite(filepath, file_size, patterns):
+                    return True
+                self._log(f"    O_DIRECT not supported here, falling back to nocache mode")
+            
+            if self.io_mode != 'buffered' and hasattr(os, 'posix_fadvise'):
+                self._nocache_overwrite(filepath, file_size, patterns)
+                return True
+            
             with open(filepath, 'rb+') as f:
                 for pass_num, pattern in enumerate(patterns, 1):
-                    self._log(f"    Pass {pass_num}/3...")
+                    self._start_pass(pass_num)
+                    start = time.perf_counter()
                     f.seek(0)
                     
-                    chunk_size = 65536  # 64KB chunks
                     bytes_written = 0
                     
                     while bytes_written < file_size:
-                        write_size = min(chunk_size, file_size - bytes_written)
+                        write_size = min(CHUNK_SIZE, file_size - bytes_written)
                         
                         if pattern is None:
                             chunk = random.randbytes(write_size)
@@ -122,7 +193,10 @@ class SecureDelete:
                         bytes_written += write_size
                     
                     f.flush()
-                    os.fsync(f.fileno())
+                    PASS_WRITE_SECONDS.observe(time.perf_counter() - start)
+                    
+                    with FSYNC_SECONDS.time():
+                        os.fsync(f.fileno())
             
             return True
             
@@ -130,6 +204,147 @@ class SecureDelete:
             self._log(f"  Error during overwrite: {e}")
             return False
     
+    def _direct_overwrite(self, filepath: Path, file_size: int,
+                          patterns: List[Optional[bytes]]) -> bool:
+        """
+        Overwrite passes with O_DIRECT so the data bypasses the page cache.
+        The aligned body is written from a page-aligned anonymous mmap buffer;
+        the unaligned tail (< 4KB) goes through a normal fd and is dropped
+        from the cache with posix_fadvise.
+        
+        Returns False if O_DIRECT is unavailable for this file, so the caller
+        can fall back to another mode.
+        """
+        if not hasattr(os, 'O_DIRECT'):
+            return False
+        
+        aligned_size = file_size - (file_size % DIRECT_ALIGN)
+        tail_size = file_size - aligned_size
+        
+        try:
+            fd = os.open(filepath, os.O_WRONLY | os.O_DIRECT)
+        except OSError as e:
+            if e.errno == errno.EINVAL:
+                return False
+            raise
+        
+        tail_fd = None
+        buf = None
+        
+        try:
+            if tail_size:
+                tail_fd = os.open(filepath, os.O_WRONLY)
+            buf = mmap.mmap(-1, DIRECT_CHUNK_SIZE)  # anonymous maps are page-aligned
+            
+            # Until the first aligned write succeeds we may still fall back,
+            # so pass 1 is only announced once O_DIRECT has proven to work
+            confirmed = aligned_size == 0
+            if confirmed:
+                self._log(f"    I/O mode: direct (O_DIRECT)")
+            
+            with memoryview(buf) as view:
+                for pass_num, pattern in enumerate(patterns, 1):
+                    if confirmed:
+                        self._start_pass(pass_num)
+                    start = time.perf_counter()
+                    
+                    if pattern is not None:
+                        buf[:] = pattern * DIRECT_CHUNK_SIZE
+                    
+                    offset = 0
+                    while offset < aligned_size:
+                        write_size = min(DIRECT_CHUNK_SIZE, aligned_size - offset)
+                        
+                        if pattern is None:
+                            buf[:write_size] = random.randbytes(write_size)
+                        
+                        try:
+                            written = os.pwrite(fd, view[:write_size], offset)
+                        except OSError as e:
+                            # Some filesystems accept the flag on open but reject the write
+                            if e.errno == errno.EINVAL and pass_num == 1 and offset == 0:
+                                return False
+                            raise
+                        
+                        # A short write leaves the next offset unaligned for O_DIRECT
+                        if written != write_size:
+                            raise OSError(errno.EIO, f"Short O_DIRECT write at offset {offset}")
+                        offset += written
+                        
+                        if not confirmed:
+                            confirmed = True
+                            self._log(f"    I/O mode: direct (O_DIRECT)")
+                            self._start_pass(pass_num)
+                    
+                    if tail_fd is not None:
+                        if pattern is None:
+                            tail = random.randbytes(tail_size)
+                        else:
+                            tail = pattern * tail_size
+                        if os.pwrite(tail_fd, tail, aligned_size) != tail_size:
+                            raise OSError(errno.EIO, f"Short write at offset {aligned_size}")
+                        os.fdatasync(tail_fd)
+                        if hasattr(os, 'posix_fadvise'):
+                            os.posix_fadvise(tail_fd, aligned_size, tail_size,
+                                             os.POSIX_FADV_DONTNEED)
+                    
+                    PASS_WRITE_SECONDS.observe(time.perf_counter() - start)
+                    
+                    with FSYNC_SECONDS.time():
+                        os.fsync(fd)
+            
+            return True
+            
+        finally:
+            if buf is not None:
+                buf.close()
+            if tail_fd is not None:
+                os.close(tail_fd)
+            os.close(fd)
+    
+    def _nocache_overwrite(self, filepath: Path, file_size: int,
+                           patterns: List[Optional[bytes]]):
+        """
+        Overwrite passes through the page cache, but sync and drop each
+        completed range with posix_fadvise(DONTNEED) so the wipe never holds
+        more than NOCACHE_FLUSH_BYTES of dirty pages.
+        """
+        self._log(f"    I/O mode: nocache (posix_fadvise DONTNEED)")
+        
+        fd = os.open(filepath, os.O_WRONLY)
+        try:
+            for pass_num, pattern in enumerate(patterns, 1):
+                self._start_pass(pass_num)
+                start = time.perf_counter()
+                
+                fill = pattern * CHUNK_SIZE if pattern is not None else None
+                offset = 0
+                dropped = 0
+                
+                while offset < file_size:
+                    write_size = min(CHUNK_SIZE, file_size - offset)
+                    
+                    if fill is None:
+                        chunk = random.randbytes(write_size)
+                    else:
+                        chunk = fill[:write_size]
+                    
+                    offset += os.pwrite(fd, chunk, offset)
+                    
+                    if offset - dropped >= NOCACHE_FLUSH_BYTES or offset >= file_size:
+                        # DONTNEED only evicts clean pages, so flush the range first
+                        os.fdatasync(fd)
+                        os.posix_fadvise(fd, dropped, offset - dropped,
+                                         os.POSIX_FADV_DONTNEED)
+                        dropped = offset
+                
+                PASS_WRITE_SECONDS.observe(time.perf_counter() - start)
+                
+                with FSYNC_SECONDS.time():
+                    os.fsync(fd)
+        finally:
+            os.close(fd)
+    
     def _ata_secure_erase_file(self, filepath: Path) -> bool:
         """
         ATA Secure Erase for SSD files
@@ -138,30 +353,11 @@ class SecureDelete:
         try:
             self._log(f"  Using ATA Secure Erase (TRIM)")
             
-            system = platform.system()
-            
             # First, delete the file to trigger TRIM
             filepath.unlink()
             
             # Force TRIM operation
-            if system == "Linux":
-                # Run fstrim on the mount point
-                mount_point = self._get_mount_point(filepath.parent)
-                subprocess.run(['fstrim', '-v', str(mount_point)], 
-                             check=False, capture_output=True)
-                self._log(f"    TRIM issued for mount point: {mount_point}")
-                
-            elif system == "Windows":
-                # Windows automatically TRIMs on delete for SSDs
-                # Force optimize (TRIM) on the drive
-                drive = str(filepath).split(':')[0] + ':'
-                subprocess.run(['defrag', drive, '/L'], 
-                             check=False, capture_output=True)
-                self._log(f"    TRIM issued for drive: {drive}")
-                
-            elif system == "Darwin":  # macOS
-                # macOS automatically TRIMs on APFS
-                self._log(f"    TRIM will be handled by APFS automatically")
+            self._issue_trim(filepath.parent)
             
             return True
             
@@ -169,6 +365,29 @@ class SecureDelete:
             self._log(f"  Error during ATA secure erase: {e}")
             return False
     
+    def _issue_trim(self, path: Path):
+        """Ask the OS to TRIM free blocks on the volume holding path"""
+        system = platform.system()
+        
+        if system == "Linux":
+            # Run fstrim on the mount point
+            mount_point = self._get_mount_point(path)
+            subprocess.run(['fstrim', '-v', str(mount_point)], 
+                         check=False, capture_output=True)
+            self._log(f"    TRIM issued for mount point: {mount_point}")
+            
+        elif system == "Windows":
+            # Windows automatically TRIMs on delete for SSDs
+            # Force optimize (TRIM) on the drive
+            drive = str(path).split(':')[0] + ':'
+            subprocess.run(['defrag', drive, '/L'], 
+                         check=False, capture_output=True)
+            self._log(f"    TRIM issued for drive: {drive}")
+            
+        elif system == "Darwin":  # macOS
+            # macOS automatically TRIMs on APFS
+            self._log(f"    TRIM will be handled by APFS automatically")
+    
     def _get_mount_point(self, path: Path) -> Path:
         """Get the mount point for a given path"""
         path = path.resolve()
@@ -202,6 +421,7 @@ class SecureDelete:
             return False
         
         self._log(f"\nSecurely deleting: {filepath}")
+        start = time.perf_counter()
         
         # Detect drive type
         is_ssd, drive = self._is_ssd(filepath)
@@ -228,6 +448,8 @@ class SecureDelete:
                     self._log(f"  Error deleting: {e}")
                     success = False
         
+        FILE_WIPE_SECONDS.observe(time.perf_counter() - start)
+        
         if success:
             self._log(f"✓ Successfully deleted: {filepath}\n")
         else:
@@ -277,6 +499,173 @@ class SecureDelete:
             success = False
         
         return success
+    
+    def _fill_free_space(self, fill_dir: Path, writer_id: int, quota: int,
+                         safety_margin: int, pattern: Optional[bytes],
+                         throttle: _Throttle, report: Callable[[int], None],
+                         stop: threading.Event, alloc_lock: threading.Lock):
+        """
+        One free-space writer: create preallocated fill files of up to
+        FILL_FILE_SIZE and stream the pattern into them until the quota is
+        used up, the volume reaches the safety margin, it runs out of space
+        or stop is set.
+        
+        The free-space check and the allocation happen under alloc_lock,
+        shared by all writers, so no writer acts on a free-space figure that
+        another writer's allocation has already made stale.
+        """
+        sync = getattr(os, 'fdatasync', os.fsync)
+        fill = pattern * FILL_CHUNK_SIZE if pattern is not None else None
+        remaining = quota
+        file_num = 0
+        
+        while remaining > 0 and not stop.is_set():
+            filepath = fill_dir / f"fill_{writer_id}_{file_num}"
+            fd = None
+            try:
+                with alloc_lock:
+                    # Re-check free space: other writers and services keep using the disk
+                    headroom = shutil.disk_usage(fill_dir).free - safety_margin
+                    size = min(FILL_FILE_SIZE, remaining, headroom)
+                    if not hasattr(os, 'posix_fallocate'):
+                        # Nothing is reserved up front, so other writers' unwritten
+                        # bytes are invisible here; a share of the headroom each
+                        # keeps their sum within it
+                        size = min(size, headroom // FILL_MAX_WRITERS)
+                    if size <= 0:
+                        break
+                    
+                    fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o600)
+                    if hasattr(os, 'posix_fallocate'):
+                        os.posix_fallocate(fd, 0, size)
+                
+                offset = 0
+                dropped = 0
+                while offset < size and not stop.is_set():
+                    write_size = min(FILL_CHUNK_SIZE, size - offset)
+                    throttle.wait(write_size)
+                    
+                    if fill is None:
+                        chunk = random.randbytes(write_size)
+                    else:
+                        chunk = fill[:write_size]
+                    
+                    written = os.write(fd, chunk)
+                    offset += written
+                    report(written)
+                    
+                    if offset - dropped >= NOCACHE_FLUSH_BYTES or offset >= size:
+                        # Keep the fill data out of the page cache
+                        sync(fd)
+                        if hasattr(os, 'posix_fadvise'):
+                            os.posix_fadvise(fd, dropped, offset - dropped,
+                                             os.POSIX_FADV_DONTNEED)
+                        dropped = offset
+            except OSError as e:
+                if e.errno != errno.ENOSPC:
+                    raise
+                self._log(f"    Writer {writer_id}: volume full, stopping")
+                break
+            finally:
+                if fd is not None:
+                    os.close(fd)
+            
+            remaining -= size
+            file_num += 1
+    
+    def wipe_free_space(self, path: str, writers: int = 4,
+                        safety_margin: int = FILL_SAFETY_MARGIN,
+                        throttle_mbps: Optional[float] = None,
+                        pattern: Optional[bytes] = None,
+                        progress: Optional[Callable[[int, int], None]] = None) -> bool:
+        """
+        Scrub the free space of the volume holding path.
+        
+        Fills the free space (minus safety_margin bytes) with preallocated
+        files written by several parallel writers, deletes them and issues a
+        single TRIM. throttle_mbps caps the combined write rate in MB/s;
+        pattern=None writes random data. progress is called with
+        (bytes_written, bytes_total) as the fill advances.
+        """
+        root = Path(path)
+        
+        if not root.is_dir():
+            self._log(f"Not a folder: {path}")
+            return False
+        
+        total = max(0, shutil.disk_usage(root).free - safety_margin)
+        writers = min(max(1, writers), FILL_MAX_WRITERS)
+        
+        self._log(f"\n{'='*60}")
+        self._log(f"Wiping free space on: {self._get_mount_point(root)}")
+        self._log(f"{'='*60}")
+        self._log(f"  Filling {total / (1 << 20):.0f} MB with {writers} writer(s)"
+                  + (f", capped at {throttle_mbps} MB/s" if throttle_mbps else ""))
+        
+        fill_dir = root / ('.wipe_' + ''.join(random.choices('0123456789abcdef', k=16)))
+        fill_dir.mkdir()
+        
+        throttle = _Throttle(throttle_mbps * (1 << 20) if throttle_mbps else None)
+        lock = threading.Lock()
+        written = [0]
+        errors = []
+        stop = threading.Event()
+        alloc_lock = threading.Lock()
+        
+        def report(nbytes: int):
+            with lock:
+                written[0] += nbytes
+                done = written[0]
+            if progress:
+                progress(done, total)
+        
+        def writer(writer_id: int, quota: int):
+            try:
+                self._fill_free_space(fill_dir, writer_id, quota, safety_margin,
+                                      pattern, throttle, report, stop, alloc_lock)
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+                self._log(f"  Error in writer {writer_id}: {e}")
+        
+        threads = []
+        removed = False
+        try:
+            for writer_id in range(writers):
+                quota = total // writers + (1 if writer_id < total % writers else 0)
+                thread = threading.Thread(target=writer, args=(writer_id, quota))
+                thread.daemon = True
+                thread.start()
+                threads.append(thread)
+            
+            for thread in threads:
+                thread.join()
+        finally:
+            # Always give the space back, even if interrupted or a start failed
+            stop.set()
+            for thread in threads:
+                thread.join()
+            
+            self._log(f"  Wrote {written[0] / (1 << 20):.0f} MB, removing fill files")
+            
+            try:
+                shutil.rmtree(fill_dir)
+                removed = True
+            except Exception as e:
+                self._log(f"✗ Error removing fill files: {e}\n")
+        
+        if not removed:
+            return False
+        
+        self._issue_trim(root)
+        
+        success = not errors
+        if success:
+            self._log(f"✓ Free space wiped\n")
+        else:
+            self._log(f"✗ Free space wipe failed\n")
+        
+        return success
 
 
 def main():
@@ -291,6 +680,7 @@ Examples:
   python secure_delete.py file.txt
   python secure_delete.py /path/to/folder -r
   python secure_delete.py secret.doc -q
+  python secure_delete.py /mnt/data --free-space --throttle 50
         """
     )
     
@@ -299,21 +689,38 @@ Examples:
                        help='Delete folder and all contents')
     parser.add_argument('-q', '--quiet', action='store_true',
                        help='Quiet mode (minimal output)')
+    parser.add_argument('--io-mode', choices=IO_MODES, default='buffered',
+                       help='Overwrite I/O mode: buffered, direct (O_DIRECT, '
+                            'bypasses page cache) or nocache (fadvise DONTNEED)')
+    parser.add_argument('--free-space', action='store_true',
+                       help='Wipe the free space of the volume holding path')
+    parser.add_argument('--writers', type=int, default=4,
+                       help=f'Parallel writers for --free-space (default: 4, max: {FILL_MAX_WRITERS})')
+    parser.add_argument('--throttle', type=float, metavar='MBPS',
+                       help='Cap --free-space write rate in MB/s')
     
     args = parser.parse_args()
     
     # Confirmation prompt
-    if not args.quiet:
+    if not args.quiet and args.free_space:
+        response = input(f"⚠️  This will fill and scrub the free space on '{args.path}'. Continue? (yes/no): ")
+        if response.lower() not in ['yes', 'y']:
+            print("Operation cancelled.")
+            return
+    elif not args.quiet:
         response = input(f"⚠️  This will PERMANENTLY delete '{args.path}'. Continue? (yes/no): ")
         if response.lower() not in ['yes', 'y']:
             print("Operation cancelled.")
             return
     
-    deleter = SecureDelete(verbose=not args.quiet)
+    deleter = SecureDelete(verbose=not args.quiet, io_mode=args.io_mode)
     
     path = Path(args.path)
     
-    if path.is_file():
+    if args.free_space:
+        success = deleter.wipe_free_space(args.path, writers=args.writers,
+                                          throttle_mbps=args.throttle)
+    elif path.is_file():
         success = deleter.secure_delete_file(args.path)
     elif path.is_dir():
         if not args.recursive:
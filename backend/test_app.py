@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('flask_cors')
+
+import app as app_module
+
+
+@pytest.fixture
+def client():
+    app_module.app.config['TESTING'] = True
+    return app_module.app.test_client()
+
+
+@pytest.mark.parametrize('payload', [
+    {'wipeAll': True},
+    {'wipeAll': True, 'mountPoint': '/definitely/not/here'},
+    {'wipeAll': True, 'mountPoint': 5},
+])
+def test_wipe_all_requires_existing_mount_point(client, payload):
+    res = client.post('/api/wipe', json={'sessionId': 's', **payload})
+    assert res.status_code == 400
+    assert 's' not in app_module.wipe_sessions
+
+
+@pytest.mark.parametrize('extra', [
+    {'writers': True},
+    {'writers': 0},
+    {'writers': 100000},
+    {'throttleMBps': True},
+    {'throttleMBps': -1},
+])
+def test_wipe_rejects_bad_free_space_options(client, tmp_path, extra):
+    res = client.post('/api/wipe', json={'sessionId': 's', 'wipeAll': True,
+                                         'mountPoint': str(tmp_path), **extra})
+    assert res.status_code == 400
+
+
+@pytest.mark.parametrize('files', [['/x', 5], ['relative.txt'], 'not-a-list'])
+def test_wipe_rejects_bad_files(client, files):
+    res = client.post('/api/wipe', json={'sessionId': 's', 'files': files})
+    assert res.status_code == 400
+    assert 's' not in app_module.wipe_sessions
+
+
+def test_metrics_endpoint(client):
+    res = client.get('/metrics')
+    assert res.status_code == 200
+    assert res.content_type.startswith('text/plain; version=0.0.4')
+    body = res.get_data(as_text=True)
+    assert '# TYPE wipe_file_seconds histogram' in body
+    assert 'wipe_sessions_active ' in body
+
+
+def test_wipe_specs_end_to_end(client, tmp_path, monkeypatch):
+    from secure_delete import SecureDelete
+    # Take the DoD overwrite path so pass_num comes from real passes
+    monkeypatch.setattr(SecureDelete, '_is_ssd', lambda self, path: (False, 'test'))
+    passes = []
+    real_start_pass = SecureDelete._start_pass
+    monkeypatch.setattr(SecureDelete, '_start_pass',
+                        lambda self, n: (passes.append(n), real_start_pass(self, n)))
+
+    count = app_module.RECENT_FILES_LIMIT + 5
+    for i in range(count):
+        sub = tmp_path / 'tree' / f"d{i % 3}"
+        sub.mkdir(parents=True, exist_ok=True)
+        (sub / f"f{i}.bin").write_bytes(b'x' * (100 + i))
+    expected_bytes = sum(100 + i for i in range(count))
+
+    res = client.post('/api/wipe', json={
+        'sessionId': 'e2e',
+        'files': [str(tmp_path / 'missing.bin')],
+        'specs': [{'path': str(tmp_path / 'tree')}],
+    })
+    assert res.status_code == 200
+
+    deadline = time.monotonic() + 30
+    while True:
+        status = client.get('/api/wipe/status/e2e').get_json()
+        if status['complete'] or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+
+    assert status['complete'] and status['success']
+    assert status['pass'] == 3
+    assert passes == [1, 2, 3] * app_module.RECENT_FILES_LIMIT + [1, 2, 3] * 5
+    assert status['filesWiped'] == count
+    assert status['filesSkipped'] == 1
+    assert status['bytesWiped'] == expected_bytes
+    assert len(status['recentFiles']) == app_module.RECENT_FILES_LIMIT
+    assert not (tmp_path / 'tree').exists()
@@ -0,0 +1,160 @@
+import os
+
+import pytest
+
+from file_walker import expand_spec, expand_specs, parse_files, parse_spec, parse_specs
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for sub in ('a', 'a/b', 'a/.git', 'c'):
+        (tmp_path / sub).mkdir()
+    for name, size in [('a/x.pdf', 10), ('a/b/y.pdf', 2000), ('a/.git/z.pdf', 5),
+                       ('a/.hidden.pdf', 5), ('c/w.txt', 1), ('top.pdf', 3)]:
+        (tmp_path / name).write_bytes(b'x' * size)
+    (tmp_path / 'c' / 'link').symlink_to('/etc')
+    return tmp_path
+
+
+def _expand(root, **raw):
+    spec = parse_spec({'path': str(root), **raw})
+    return sorted(os.path.relpath(p, root) for p in expand_spec(spec))
+
+
+def test_parse_spec_defaults_from_string(tmp_path):
+    spec = parse_spec(str(tmp_path))
+    assert spec['path'] == str(tmp_path)
+    assert spec['include'] == [] and spec['exclude'] == []
+    assert spec['recursive'] is True
+    assert spec['minSize'] is None
+
+
+@pytest.mark.parametrize('raw', [
+    'relative/path',
+    {'path': ''},
+    {'path': '/tmp', 'foo': 1},
+    {'path': '/tmp', 'include': '*.pdf'},
+    {'path': '/tmp', 'recursive': 'yes'},
+    {'path': '/tmp', 'minSize': -1},
+    {'path': '/tmp', 'maxAge': True},
+    5,
+])
+def test_parse_spec_rejects_bad_input(raw):
+    with pytest.raises(ValueError):
+        parse_spec(raw)
+
+
+def test_parse_specs_requires_list():
+    with pytest.raises(ValueError):
+        parse_specs('/tmp')
+
+
+@pytest.mark.parametrize('files', [['/x', 5], ['relative'], '/x', [None]])
+def test_parse_files_rejects_bad_elements(files):
+    with pytest.raises(ValueError):
+        parse_files(files)
+
+
+def test_parse_files_accepts_absolute_paths():
+    assert parse_files(['/a', '/b/c']) == ['/a', '/b/c']
+
+
+def test_directory_walk_includes_hidden_and_skips_symlinks(tree):
+    assert _expand(tree) == ['a/.git/z.pdf', 'a/.hidden.pdf', 'a/b/y.pdf',
+                             'a/x.pdf', 'c/w.txt', 'top.pdf']
+
+
+def test_filters(tree):
+    assert _expand(tree, include=['*.pdf'], exclude=['.*'], maxSize=100) == ['a/x.pdf', 'top.pdf']
+    assert _expand(tree, recursive=False) == ['top.pdf']
+    assert _expand(tree, minSize=1000) == ['a/b/y.pdf']
+    assert _expand(tree, minAge=3600) == []
+
+
+def test_glob_and_walk_agree_on_hidden_files(tree):
+    walked = _expand(tree, include=['*.pdf'])
+    globbed = sorted(os.path.relpath(p, tree)
+                     for p in expand_spec(parse_spec(str(tree / '**' / '*.pdf'))))
+    assert globbed == walked
+
+
+def test_files_deleted_during_walk_are_yielded_once(tmp_path):
+    for i in range(200):
+        (tmp_path / f"f{i}").write_bytes(b'x')
+
+    seen = []
+    for path in expand_spec(parse_spec(str(tmp_path))):
+        seen.append(path)
+        # Mimic secure deletion: rename to a random name, then unlink
+        renamed = os.path.join(tmp_path, 'r' + os.path.basename(path))
+        os.rename(path, renamed)
+        os.unlink(renamed)
+
+    assert len(seen) == len(set(seen)) == 200
+
+
+def test_prune_dirs_removes_emptied_tree(tree):
+    for path in expand_specs(parse_specs([{'path': str(tree), 'exclude': ['*.txt']}]),
+                             prune_dirs=True):
+        os.unlink(path)
+
+    # c/ keeps the unselected w.txt and the symlink; everything else is gone
+    assert sorted(os.listdir(tree)) == ['c']
+    assert sorted(os.listdir(tree / 'c')) == ['link', 'w.txt']
+
+
+def test_prune_dirs_removes_root_when_empty(tree):
+    for path in expand_spec(parse_spec(str(tree / 'a')), prune_dirs=True):
+        os.unlink(path)
+
+    assert not (tree / 'a').exists()
+
+
+@pytest.fixture
+def project(tmp_path):
+    root = tmp_path / 'proj'
+    (root / 'keep_empty').mkdir(parents=True)
+    (root / 'src' / 'logs').mkdir(parents=True)
+    (root / 'src' / 'main.c').write_bytes(b'int main;')
+    (root / 'src' / 'logs' / 'a.log').write_bytes(b'log')
+    return root
+
+
+def _wipe(specs):
+    wiped = []
+    for path in expand_specs(parse_specs(specs), prune_dirs=True):
+        os.unlink(path)
+        wiped.append(os.path.basename(path))
+    return wiped
+
+
+def test_prune_keeps_preexisting_empty_dir_for_filtered_spec(project):
+    assert _wipe([{'path': str(project), 'include': ['*.log']}]) == ['a.log']
+
+    # logs/ was emptied by the wipe; keep_empty/ and the rest were never touched
+    assert (project / 'keep_empty').is_dir()
+    assert (project / 'src' / 'main.c').exists()
+    assert not (project / 'src' / 'logs').exists()
+
+
+def test_prune_with_filter_matching_nothing_removes_nothing(project):
+    (project / 'src' / 'main.c').unlink()
+    (project / 'src' / 'logs' / 'a.log').unlink()
+
+    assert _wipe([{'path': str(project), 'minSize': 1 << 30}]) == []
+
+    assert (project / 'keep_empty').is_dir()
+    assert (project / 'src' / 'logs').is_dir()
+
+
+def test_prune_removes_parents_emptied_by_the_wipe(project):
+    (project / 'keep_empty').rmdir()
+    (project / 'src' / 'main.c').unlink()
+
+    assert _wipe([{'path': str(project), 'include': ['*.log']}]) == ['a.log']
+    assert not project.exists()
+
+
+def test_prune_unfiltered_spec_removes_whole_tree(project):
+    assert sorted(_wipe([str(project)])) == ['a.log', 'main.c']
+    assert not project.exists()
@@ -0,0 +1,125 @@
+import io
+import time
+import threading
+
+import pytest
+
+import metrics
+
+
+def test_histogram_render_is_cumulative():
+    hist = metrics.Histogram('test_render_seconds', 'Test histogram', buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        hist.observe(value)
+
+    assert hist.render() == [
+        '# HELP test_render_seconds Test histogram',
+        '# TYPE test_render_seconds histogram',
+        'test_render_seconds_bucket{le="0.1"} 2',
+        'test_render_seconds_bucket{le="1.0"} 3',
+        'test_render_seconds_bucket{le="+Inf"} 4',
+        'test_render_seconds_sum 5.65',
+        'test_render_seconds_count 4',
+    ]
+
+
+def test_histogram_timer_observes_once():
+    hist = metrics.Histogram('test_timer_seconds', 'Test timer')
+    with hist.time():
+        pass
+    assert hist.render()[-1] == 'test_timer_seconds_count 1'
+
+
+def test_duplicate_metric_name_rejected():
+    metrics.Histogram('test_duplicate_seconds', 'First')
+    with pytest.raises(ValueError):
+        metrics.Histogram('test_duplicate_seconds', 'Second')
+
+
+def test_failing_gauge_renders_nan():
+    def broken():
+        raise RuntimeError("collector failed")
+
+    gauge = metrics.Gauge('test_broken_gauge', 'Always fails', broken)
+    assert gauge.render()[-1] == 'test_broken_gauge NaN'
+
+
+def test_render_includes_registered_metrics():
+    metrics.Gauge('test_render_gauge', 'Fixed value', lambda: 7)
+    text = metrics.render()
+    assert text.endswith('\n')
+    assert 'test_render_gauge 7\n' in text
+    assert '# TYPE metrics_collect_seconds histogram' in text
+
+
+def test_async_logger_flush_writes_everything_in_order():
+    stream = io.StringIO()
+    logger = metrics.AsyncLogger(stream)
+    for i in range(500):
+        logger.log(f"line {i}")
+    logger.flush()
+
+    assert stream.getvalue().splitlines() == [f"line {i}" for i in range(500)]
+    assert logger.depth() == 0
+
+
+def test_async_logger_flush_without_messages_returns():
+    metrics.AsyncLogger(io.StringIO()).flush(timeout=0.1)
+
+
+class _FlakyStream(io.StringIO):
+    """Raises on messages containing a marker, like a non-UTF-8 console"""
+
+    def write(self, text):
+        if '✓' in text:
+            raise UnicodeEncodeError('cp1252', text, 0, 1, 'character maps to <undefined>')
+        return super().write(text)
+
+
+def test_async_logger_survives_write_errors():
+    stream = _FlakyStream()
+    logger = metrics.AsyncLogger(stream)
+    logger.log("✓ Successfully deleted")
+    for i in range(1000):
+        logger.log(f"line {i}")
+
+    start = time.monotonic()
+    logger.flush()
+
+    assert time.monotonic() - start < 1.0
+    assert logger.thread.is_alive()
+    assert logger.write_errors == 1
+    assert stream.getvalue().splitlines() == [f"line {i}" for i in range(1000)]
+
+
+class _BlockedStream(io.StringIO):
+    """Blocks every write until released, like a stalled stdout"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def write(self, text):
+        self.release.wait(5)
+        return super().write(text)
+
+
+def test_async_logger_queue_is_bounded_and_counts_drops():
+    stream = _BlockedStream()
+    logger = metrics.AsyncLogger(stream, maxsize=5)
+    for i in range(100):
+        logger.log(f"line {i}")
+
+    assert logger.depth() <= 5
+    # At most one message in the writer's hands plus a full queue survive
+    assert 100 - 6 <= logger.dropped <= 100 - 5
+
+    stream.release.set()
+    logger.flush()
+    assert len(stream.getvalue().splitlines()) == 100 - logger.dropped
+
+
+def test_logger_counters_are_exported():
+    text = metrics.render()
+    assert '# TYPE log_messages_dropped_total counter' in text
+    assert '# TYPE log_write_errors_total counter' in text
@@ -0,0 +1,299 @@
+import os
+import errno
+import shutil
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import secure_delete
+from secure_delete import DIRECT_ALIGN, SecureDelete
+
+
+@pytest.fixture
+def deleter(monkeypatch):
+    trims = []
+    monkeypatch.setattr(SecureDelete, '_issue_trim', lambda self, path: trims.append(path))
+    deleter = SecureDelete(verbose=False)
+    deleter.trims = trims
+    return deleter
+
+
+def _margin_for(path, nbytes):
+    """Safety margin that leaves only nbytes for the fill"""
+    return shutil.disk_usage(path).free - nbytes
+
+
+def _leftovers(path):
+    return [p for p in path.iterdir() if p.name.startswith('.wipe_')]
+
+
+def test_wipe_free_space_fills_and_cleans_up(tmp_path, deleter):
+    progress = []
+    ok = deleter.wipe_free_space(str(tmp_path), writers=2,
+                                 safety_margin=_margin_for(tmp_path, 4 << 20),
+                                 pattern=b'\x00',
+                                 progress=lambda done, total: progress.append((done, total)))
+
+    assert ok
+    assert _leftovers(tmp_path) == []
+    assert deleter.trims == [tmp_path]
+    assert progress and progress[-1][0] > 0
+
+
+def test_wipe_free_space_writer_error_removes_fill_files(tmp_path, deleter, monkeypatch):
+    def failing_writer(self, fill_dir, writer_id, *args):
+        (fill_dir / f"fill_{writer_id}_0").write_bytes(b'\x00' * 1024)
+        raise OSError("disk went away")
+
+    monkeypatch.setattr(SecureDelete, '_fill_free_space', failing_writer)
+
+    assert not deleter.wipe_free_space(str(tmp_path), writers=2,
+                                       safety_margin=_margin_for(tmp_path, 4 << 20))
+    assert _leftovers(tmp_path) == []
+
+
+def test_wipe_free_space_interrupted_start_stops_writers_and_cleans_up(tmp_path, deleter, monkeypatch):
+    stopped = []
+
+    def blocking_writer(self, fill_dir, writer_id, quota, safety_margin,
+                        pattern, throttle, report, stop, alloc_lock):
+        (fill_dir / f"fill_{writer_id}_0").write_bytes(b'\x00' * 1024)
+        stopped.append(stop.wait(5))
+
+    class FailingThread(threading.Thread):
+        started = 0
+
+        def start(self):
+            FailingThread.started += 1
+            if FailingThread.started > 1:
+                raise RuntimeError("can't start new thread")
+            super().start()
+
+    monkeypatch.setattr(SecureDelete, '_fill_free_space', blocking_writer)
+    monkeypatch.setattr(secure_delete.threading, 'Thread', FailingThread)
+
+    with pytest.raises(RuntimeError):
+        deleter.wipe_free_space(str(tmp_path), writers=3,
+                                safety_margin=_margin_for(tmp_path, 4 << 20))
+
+    assert stopped == [True]
+    assert _leftovers(tmp_path) == []
+
+
+def test_wipe_free_space_caps_writers(tmp_path, deleter, monkeypatch):
+    writer_ids = []
+    lock = threading.Lock()
+
+    def counting_writer(self, fill_dir, writer_id, *args):
+        with lock:
+            writer_ids.append(writer_id)
+
+    monkeypatch.setattr(SecureDelete, '_fill_free_space', counting_writer)
+
+    assert deleter.wipe_free_space(str(tmp_path), writers=1000,
+                                   safety_margin=_margin_for(tmp_path, 4 << 20))
+    assert len(writer_ids) == secure_delete.FILL_MAX_WRITERS
+
+
+def test_overwrite_reports_real_passes(tmp_path):
+    target = tmp_path / 'secret.bin'
+    target.write_bytes(b'a' * 100000)
+    passes = []
+
+    assert SecureDelete(verbose=False, on_pass=passes.append)._dod_overwrite(target)
+    assert passes == [1, 2, 3]
+
+
+SIZES = [0, 1, 4095, 4096, 5000, (1 << 20) + 123]
+
+needs_o_direct = pytest.mark.skipif(not hasattr(os, 'O_DIRECT'), reason="O_DIRECT is Linux-only")
+
+
+@pytest.fixture
+def fixed_random(monkeypatch):
+    """Make the random pass deterministic so the final content is known"""
+    monkeypatch.setattr(secure_delete.random, 'randbytes', lambda n: b'\x5a' * n)
+
+
+@pytest.fixture
+def fd_tracker(monkeypatch):
+    """
+    Record every fd opened and closed by secure_delete. O_DIRECT is
+    stripped from the flags so the direct path runs on any filesystem;
+    the fds it was requested for are collected in tracker.direct.
+    """
+    real_open, real_close = os.open, os.close
+    tracker = SimpleNamespace(opened=[], closed=[], direct=set())
+
+    def fake_open(path, flags, *args):
+        direct = hasattr(os, 'O_DIRECT') and flags & os.O_DIRECT
+        fd = real_open(path, flags & ~os.O_DIRECT if direct else flags, *args)
+        tracker.opened.append(fd)
+        if direct:
+            tracker.direct.add(fd)
+        return fd
+
+    def fake_close(fd):
+        tracker.closed.append(fd)
+        tracker.direct.discard(fd)  # the number may be reused by a later open
+        real_close(fd)
+
+    monkeypatch.setattr(os, 'open', fake_open)
+    monkeypatch.setattr(os, 'close', fake_close)
+    return tracker
+
+
+def _overwrite(tmp_path, mode, size, **kwargs):
+    target = tmp_path / 'secret.bin'
+    target.write_bytes(b'a' * size)
+    passes = []
+    ok = SecureDelete(verbose=False, io_mode=mode, on_pass=passes.append,
+                      **kwargs)._dod_overwrite(target)
+    return ok, target.read_bytes(), passes
+
+
+@pytest.mark.parametrize('mode', secure_delete.IO_MODES)
+@pytest.mark.parametrize('size', SIZES)
+def test_overwrite_modes_replace_content(tmp_path, fixed_random, mode, size):
+    ok, data, passes = _overwrite(tmp_path, mode, size)
+
+    assert ok
+    assert data == b'\x5a' * size
+    assert passes == ([1, 2, 3] if size else [])
+
+
+@needs_o_direct
+@pytest.mark.parametrize('size', SIZES)
+def test_direct_overwrite_uses_o_direct_path(tmp_path, fixed_random, fd_tracker, monkeypatch, size):
+    monkeypatch.setattr(SecureDelete, '_nocache_overwrite',
+                        lambda *args: pytest.fail("fell back to nocache"))
+
+    ok, data, passes = _overwrite(tmp_path, 'direct', size)
+
+    assert ok and data == b'\x5a' * size
+    assert sorted(fd_tracker.closed) == sorted(fd_tracker.opened)
+
+
+@needs_o_direct
+def test_direct_falls_back_when_open_rejects_o_direct(tmp_path, fixed_random, monkeypatch):
+    real_open = os.open
+
+    def fake_open(path, flags, *args):
+        if flags & os.O_DIRECT:
+            raise OSError(errno.EINVAL, "Invalid argument")
+        return real_open(path, flags, *args)
+
+    monkeypatch.setattr(os, 'open', fake_open)
+
+    ok, data, passes = _overwrite(tmp_path, 'direct', 5000)
+    assert ok and data == b'\x5a' * 5000
+    assert passes == [1, 2, 3]
+
+
+@needs_o_direct
+def test_direct_falls_back_when_first_write_rejected(tmp_path, fixed_random, fd_tracker, monkeypatch):
+    real_pwrite = os.pwrite
+    messages = []
+
+    def fake_pwrite(fd, data, offset):
+        if fd in fd_tracker.direct:
+            raise OSError(errno.EINVAL, "Invalid argument")
+        return real_pwrite(fd, data, offset)
+
+    monkeypatch.setattr(os, 'pwrite', fake_pwrite)
+    monkeypatch.setattr(SecureDelete, '_log', lambda self, message: messages.append(message))
+
+    ok, data, passes = _overwrite(tmp_path, 'direct', 5000)
+
+    assert ok and data == b'\x5a' * 5000
+    assert passes == [1, 2, 3]
+    assert not any('I/O mode: direct' in m for m in messages)
+    assert sorted(fd_tracker.closed) == sorted(fd_tracker.opened)
+
+
+@needs_o_direct
+def test_direct_short_write_fails_and_closes_fds(tmp_path, fd_tracker, monkeypatch):
+    real_pwrite = os.pwrite
+
+    def short_pwrite(fd, data, offset):
+        if fd in fd_tracker.direct:
+            return len(data) - DIRECT_ALIGN
+        return real_pwrite(fd, data, offset)
+
+    monkeypatch.setattr(os, 'pwrite', short_pwrite)
+
+    ok, _, _ = _overwrite(tmp_path, 'direct', 3 * DIRECT_ALIGN + 100)
+
+    assert not ok
+    assert len(fd_tracker.opened) == 2  # O_DIRECT fd and tail fd
+    assert sorted(fd_tracker.closed) == sorted(fd_tracker.opened)
+
+
+@needs_o_direct
+def test_direct_setup_error_closes_fds(tmp_path, fd_tracker, monkeypatch):
+    def failing_mmap(*args):
+        raise OSError(errno.ENOMEM, "Cannot allocate memory")
+
+    monkeypatch.setattr(secure_delete.mmap, 'mmap', failing_mmap)
+
+    ok, _, _ = _overwrite(tmp_path, 'direct', 5000)
+
+    assert not ok
+    assert len(fd_tracker.opened) == 2
+    assert sorted(fd_tracker.closed) == sorted(fd_tracker.opened)
+
+
+@pytest.mark.skipif(not hasattr(os, 'posix_fadvise'), reason="needs posix_fadvise")
+def test_nocache_write_error_closes_fd(tmp_path, fd_tracker, monkeypatch):
+    def failing_pwrite(fd, data, offset):
+        raise OSError(errno.EIO, "Input/output error")
+
+    monkeypatch.setattr(os, 'pwrite', failing_pwrite)
+
+    ok, _, _ = _overwrite(tmp_path, 'nocache', 5000)
+
+    assert not ok
+    assert len(fd_tracker.opened) == 1
+    assert fd_tracker.closed == fd_tracker.opened
+
+
+@pytest.mark.skipif(not hasattr(os, 'posix_fallocate'), reason="needs posix_fallocate")
+def test_parallel_writers_never_allocate_past_safety_margin(tmp_path, deleter, monkeypatch):
+    mb = 1 << 20
+    capacity, margin = 32 * mb, 4 * mb
+    lock = threading.Lock()
+    volume = SimpleNamespace(external=0, calls=0, lowest_free=capacity)
+
+    def fill_bytes():
+        return sum(p.stat().st_size for p in tmp_path.rglob('fill_*'))
+
+    def fake_disk_usage(path):
+        # Other services keep growing while the wipe runs; the sleep widens
+        # the window between a writer's check and its allocation
+        with lock:
+            volume.calls += 1
+            if volume.calls > 1:
+                volume.external += mb // 2
+            free = capacity - volume.external - fill_bytes()
+        time.sleep(0.005)
+        return shutil._ntuple_diskusage(capacity, capacity - free, free)
+
+    real_fallocate = os.posix_fallocate
+
+    def checked_fallocate(fd, offset, size):
+        real_fallocate(fd, offset, size)
+        with lock:
+            free = capacity - volume.external - fill_bytes()
+            volume.lowest_free = min(volume.lowest_free, free)
+
+    monkeypatch.setattr(secure_delete.shutil, 'disk_usage', fake_disk_usage)
+    monkeypatch.setattr(os, 'posix_fallocate', checked_fallocate)
+    monkeypatch.setattr(secure_delete, 'FILL_FILE_SIZE', mb)
+    monkeypatch.setattr(secure_delete, 'FILL_CHUNK_SIZE', 256 << 10)
+
+    assert deleter.wipe_free_space(str(tmp_path), writers=8, safety_margin=margin,
+                                   pattern=b'\x00')
+    assert volume.lowest_free >= margin
+    assert _leftovers(tmp_path) == []